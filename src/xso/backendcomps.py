@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import xsimlab as xs
 from .core import XSOCore
 
@@ -15,6 +17,9 @@ class Backend:
     __________
     solver_type : xarray-simlab variable
         a string argument passed at model setup, that defines which solver is used
+    flux_workers : xarray-simlab variable
+        number of threads used to evaluate independent fluxes in parallel,
+        default is 0, which evaluates all fluxes sequentially
     core : xarray-simlab any_object
         stores the XSOCore class initialized with passed solver_type
     m : xarray-simlab any_object
@@ -29,6 +34,8 @@ class Backend:
     """
 
     solver_type = xs.variable(intent='in', description='solver type to use for model')
+    flux_workers = xs.variable(intent='in', default=0,
+                               description='number of threads used to evaluate independent fluxes')
     core = xs.any_object(description='model backend instance is stored here')
     m = xs.any_object(description='math wrapper functions provided by solver')
 
@@ -37,7 +44,7 @@ class Backend:
 
         Creates core attribute to hold XSOCore, and m attribute to hold
         math function wrappers."""
-        self.core = XSOCore(self.solver_type)
+        self.core = XSOCore(self.solver_type, int(self.flux_workers))
         self.m = self.core.solver.MathFunctionWrappers
 
     def finalize(self):
@@ -201,9 +208,17 @@ class Time(FirstInit):
         dtdt = 1.
         return dtdt
 
+    # time flux reads no model state
+    time_flux.state_labels = frozenset()
+
 
+@lru_cache(maxsize=None)
 def create_time_component(time_unit):
-    """Helper function to create a Time component with a custom unit registered through the backend."""
+    """Helper function to create a Time component with a custom unit registered through the backend.
+
+    The created process class is cached per time unit, so that repeated model
+    creation with the same unit reuses a single class.
+    """
 
     @xs.process
     class Time(FirstInit):
@@ -234,4 +249,7 @@ def create_time_component(time_unit):
             dtdt = 1.
             return dtdt
 
+        # time flux reads no model state
+        time_flux.state_labels = frozenset()
+
     return Time
@@ -6,11 +6,18 @@ from attr import fields_dict
 from collections import OrderedDict, defaultdict, Counter
 from functools import wraps
 import inspect
+import operator
 import numpy as np
 
 from .variables import XSOVarType
 from .backendcomps import FirstInit, SecondInit, ThirdInit, FourthInit, FifthInit
 
+_VAR = XSOVarType.VARIABLE
+_PAR = XSOVarType.PARAMETER
+_FORC = XSOVarType.FORCING
+_FLUX = XSOVarType.FLUX
+_INDEX = XSOVarType.INDEX
+
 
 def _create_variables_dict(process_cls):
     """Get all phydra variables declared in a component.
@@ -21,88 +28,103 @@ def _create_variables_dict(process_cls):
     )
 
 
-def _convert_2_xsimlabvar(var, intent='in',
-                          var_dims=None, value_store=False, groups=None,
-                          description_label='', attrs=True):
-    """Converts XSO variables to xarray-simlab variables to be used in the model backend.
+def _var_description(var, description_label):
+    """Returns description label extended by the description stored in variable metadata."""
+    var_description = var.metadata.get('description')
+    if var_description:
+        return description_label + var_description
+    return description_label
+
+
+def _var_dims(var):
+    """Returns dimensions stored in variable metadata, defaulting to scalar."""
+    var_dims = var.metadata.get('dims')
+    if var_dims is None:
+        return ()
+    return var_dims
+
 
-    Function receives variable as attr in _make_xsimlab_vars function and extracts
-    description, dimensions and metadata, then passes it and additional arguments
-    through xarray-simlab's xs.variable function.
+def _append_time_dim(var, var_dims):
+    """Returns dimensions of a value store variable, which have 'time' as last dimension.
+
+    Parameters
+    ----------
+    var : attr._Make.Attribute
+        XSO variable defined in object decorated with xso.component()
+    var_dims : tuple or str or list or None
+        Dimensions as defined in variable metadata, can be singular string,
+        tuple of strings or list of either.
+    """
+    if not var_dims:
+        # if there is no dim supplied, we need 'time' as
+        return 'time'
+    elif 'time' in var_dims:
+        return var_dims
+    elif isinstance(var_dims, str):
+        return var_dims, 'time'
+    elif isinstance(var_dims, tuple):
+        return var_dims + ('time',)
+    elif isinstance(var_dims, list):
+        _dims = []
+        for dim in var_dims:
+            if isinstance(dim, str):
+                _dims.append((dim, 'time'))
+            else:
+                _dims.append((*dim, 'time'))
+        return _dims
+    else:
+        raise ValueError("Failed to parse dims argument for variable of type:",
+                         var.metadata["var_type"], "with description:", var.metadata.get('description'),
+                         "with dimensions:", var_dims)
+
+
+def _make_input_var(var, var_dims, description_label):
+    """Converts XSO variable to xarray-simlab input variable to be used in the model backend.
 
     Parameters
     ----------
     var : attr._Make.Attribute
         XSO variable defined in object decorated with xso.component()
-    intent : str ('in' or 'out')
-        passed along, defines variable as receiving input from another component
-        or being initialized within this component.
     var_dims : tuple or str
-        Defines dimensionality of created xsimlab variable,
-        can be singular string or tuple of strings.
-    value_store : bool
-        When true, the ouput of variable is stored to xsimlab variable. Adds 'time' dimension.
-    groups : str
-        When defined, the variable output can be referenced via xarray simlabs
-        group variable in other XSO components.
+        Dimensionality of created xsimlab variable, computed by the caller.
     description_label : str
         Description stored with Xarray Dataset created by xsimlab.
-    attrs : bool
-        If true, attrs defined in variable metadata are passed along to xsimlab variable function.
 
     Returns
     -------
     xs.variable
         attr class handled by Xarray-simlab, the functional foundation of XSO
     """
-    # get variable metadata
-    var_description = var.metadata.get('description')
-    if var_description:
-        description_label = description_label + var_description
+    return xs.variable(intent='in', dims=var_dims,
+                       description=_var_description(var, description_label),
+                       attrs=var.metadata.get('attrs'))
 
-    if var_dims is None:
-        var_dims = var.metadata.get('dims')
-
-    # initialize dimensions, with time if value_store is true
-    if value_store:
-        if not var_dims:
-            # if there is no dim supplied, we need 'time' as
-            var_dims = 'time'
-        elif 'time' in var_dims:
-            pass
-        elif isinstance(var_dims, str):
-            var_dims = (var_dims, 'time')
-        elif isinstance(var_dims, tuple):
-            var_dims = var_dims + ('time',)
-        elif isinstance(var_dims, list):
-            _dims = []
-            for dim in var_dims:
-                if isinstance(dim, str):
-                    _dims.append((dim, 'time'))
-                else:
-                    _dims.append((*dim, 'time'))
-            var_dims = _dims
-        else:
-            raise ValueError("Failed to parse dims argument for variable of type:",
-                             var.metadata["var_type"], "with description:", description_label,
-                             "with dimensions:", var_dims)
 
-    if var_dims is None:
-        var_dims = ()
+def _make_output_var(var, description_label):
+    """Converts XSO variable to xarray-simlab output variable, that the model output is stored to.
 
-    if attrs:
-        var_attrs = var.metadata.get('attrs')
-    else:
-        var_attrs = {}
+    The dimensions defined in variable metadata are extended with the 'time' dimension.
 
-    # return fully functional xarray-simlab variable
-    return xs.variable(intent=intent, dims=var_dims, groups=groups,
-                       description=description_label, attrs=var_attrs)
+    Parameters
+    ----------
+    var : attr._Make.Attribute
+        XSO variable defined in object decorated with xso.component()
+    description_label : str
+        Description stored with Xarray Dataset created by xsimlab.
+
+    Returns
+    -------
+    xs.variable
+        attr class handled by Xarray-simlab, the functional foundation of XSO
+    """
+    return xs.variable(intent='out', dims=_append_time_dim(var, var.metadata.get('dims')),
+                       description=_var_description(var, description_label),
+                       attrs=var.metadata.get('attrs'))
 
 
 def _make_xso_variable(label, variable):
-    """Checks for type of variable defined and calls _convert_2_xsimlabvar function
-    accordingly. Returns dict with label and xsimlab variable as key/value pairs.
+    """Checks for type of variable defined and calls _make_input_var and _make_output_var
+    functions accordingly. Returns dict with label and xsimlab variable as key/value pairs.
     """
     xs_var_dict = defaultdict()
     if variable.metadata.get('foreign') is True:
@@ -111,60 +133,52 @@ def _make_xso_variable(label, variable):
             var_dims = variable.metadata.get('dims')
             if var_dims is None:
                 raise ValueError("Variable with list_input=True requires passing dimension to dims keyword argument")
-            xs_var_dict[label] = _convert_2_xsimlabvar(var=variable, var_dims=var_dims,
-                                                       description_label='label list / ')
+            xs_var_dict[label] = _make_input_var(variable, var_dims, 'label list / ')
         else:
-            xs_var_dict[label] = _convert_2_xsimlabvar(var=variable, var_dims=(),
-                                                       description_label='label reference / ')
+            xs_var_dict[label] = _make_input_var(variable, (), 'label reference / ')
     elif variable.metadata.get('foreign') is False:
-        xs_var_dict[label + '_label'] = _convert_2_xsimlabvar(var=variable, var_dims=(),
-                                                              description_label='label / ')
-        xs_var_dict[label + '_init'] = _convert_2_xsimlabvar(var=variable, description_label='initial value / ')
-        xs_var_dict[label] = _convert_2_xsimlabvar(var=variable, intent='out',
-                                                   value_store=True,
-                                                   description_label='output of variable / ')
+        xs_var_dict[label + '_label'] = _make_input_var(variable, (), 'label / ')
+        xs_var_dict[label + '_init'] = _make_input_var(variable, _var_dims(variable), 'initial value / ')
+        xs_var_dict[label] = _make_output_var(variable, 'output of variable / ')
     return xs_var_dict
 
 
 def _make_xso_parameter(label, variable):
-    """Checks for type of variable defined and calls _convert_2_xsimlabvar function
-    accordingly. Returns dict with label and xsimlab variable as key/value pairs.
+    """Calls _make_input_var function for parameter.
+    Returns dict with label and xsimlab variable as key/value pairs.
     """
     xs_var_dict = defaultdict()
-    xs_var_dict[label] = _convert_2_xsimlabvar(var=variable, description_label='parameter / ')
+    xs_var_dict[label] = _make_input_var(variable, _var_dims(variable), 'parameter / ')
     return xs_var_dict
 
 
 def _make_xso_forcing(label, variable):
-    """Checks for type of variable defined and calls _convert_2_xsimlabvar function
-    accordingly. Returns dict with label and xsimlab variable as key/value pairs.
+    """Checks for type of variable defined and calls _make_input_var and _make_output_var
+    functions accordingly. Returns dict with label and xsimlab variable as key/value pairs.
     """
     xs_var_dict = defaultdict()
     if variable.metadata.get('foreign') is True:
-        xs_var_dict[label] = _convert_2_xsimlabvar(var=variable, description_label='label reference / ')
+        xs_var_dict[label] = _make_input_var(variable, _var_dims(variable), 'label reference / ')
     elif variable.metadata.get('foreign') is False:
-        xs_var_dict[label + '_label'] = _convert_2_xsimlabvar(var=variable, description_label='label / ')
-        xs_var_dict[label + '_value'] = _convert_2_xsimlabvar(var=variable, intent='out',
-                                                              value_store=True,
-                                                              description_label='output of forcing value / ')
+        xs_var_dict[label + '_label'] = _make_input_var(variable, _var_dims(variable), 'label / ')
+        xs_var_dict[label + '_value'] = _make_output_var(variable, 'output of forcing value / ')
     return xs_var_dict
 
 
 def _make_xso_flux(label, variable):
-    """Checks for type of variable defined and calls _convert_2_xsimlabvar function
+    """Checks for type of variable defined and calls _make_output_var function
     accordingly. Returns dict with label and xsimlab variable as key/value pairs.
     """
     xs_var_dict = defaultdict()
-    xs_var_dict[label + '_value'] = _convert_2_xsimlabvar(var=variable, intent='out',
-                                                          value_store=True,
-                                                          description_label='output of flux value / ')
+    xs_var_dict[label + '_value'] = _make_output_var(variable, 'output of flux value / ')
     group = variable.metadata.get('group')
     group_to_arg = variable.metadata.get('group_to_arg')
 
     if group:
-        xs_var_dict[label + '_label'] = _convert_2_xsimlabvar(var=variable, intent='out', groups=group, var_dims=(),
-                                                              description_label='label reference with group / ',
-                                                              attrs=False)
+        xs_var_dict[label + '_label'] = xs.variable(intent='out', dims=(), groups=group,
+                                                    description=_var_description(variable,
+                                                                                 'label reference with group / '),
+                                                    attrs={})
     if group_to_arg:
         xs_var_dict[group_to_arg] = xs.group(group_to_arg)
 
@@ -172,16 +186,12 @@ def _make_xso_flux(label, variable):
 
 
 def _make_xso_index(label, variable):
-    """Checks for type of variable defined and calls _convert_2_xsimlabvar function
+    """Checks for type of variable defined and calls _make_input_var function
     accordingly. Returns dict with label and xsimlab variable as key/value pairs.
     """
     xs_var_dict = defaultdict()
 
-    description_label = 'index / '
-    # get variable metadata
-    var_description = variable.metadata.get('description')
-    if var_description:
-        description_label = description_label + var_description
+    description_label = _var_description(variable, 'index / ')
 
     var_dims = variable.metadata.get('dims')
 
@@ -197,19 +207,10 @@ def _make_xso_index(label, variable):
         var_attrs = {}
 
     xs_var_dict[label] = xs.index(dims=var_dims, description=description_label, attrs=var_attrs)
-    xs_var_dict[label + '_index'] = _convert_2_xsimlabvar(var=variable, description_label='index / ')
+    xs_var_dict[label + '_index'] = _make_input_var(variable, var_dims, 'index / ')
     return xs_var_dict
 
 
-_make_xsimlab_vars = {
-    XSOVarType.VARIABLE: _make_xso_variable,
-    XSOVarType.FORCING: _make_xso_forcing,
-    XSOVarType.PARAMETER: _make_xso_parameter,
-    XSOVarType.FLUX: _make_xso_flux,
-    XSOVarType.INDEX: _make_xso_index,
-}
-
-
 def _create_xsimlab_var_dict(cls_vars):
     """Parses through attributes defined in xso.component decorated class
     and extracts those relevant for XSO.
@@ -221,10 +222,20 @@ def _create_xsimlab_var_dict(cls_vars):
 
     for key, var in cls_vars.items():
         var_type = var.metadata.get('var_type')
-        var_dict = _make_xsimlab_vars[var_type](key, var)
+        if var_type is _VAR:
+            var_dict = _make_xso_variable(key, var)
+        elif var_type is _FORC:
+            var_dict = _make_xso_forcing(key, var)
+        elif var_type is _PAR:
+            var_dict = _make_xso_parameter(key, var)
+        elif var_type is _FLUX:
+            var_dict = _make_xso_flux(key, var)
+        elif var_type is _INDEX:
+            var_dict = _make_xso_index(key, var)
+        else:
+            raise ValueError(f"Unknown XSO variable type {var_type} of variable {key}")
 
-        for xs_key, xs_var in var_dict.items():
-            xs_var_dict[xs_key] = xs_var
+        xs_var_dict.update(var_dict)
 
     return xs_var_dict
 
@@ -234,7 +245,7 @@ def _create_forcing_dict(cls, var_dict):
     forcings_dict = defaultdict()
 
     for key, var in var_dict.items():
-        if var.metadata.get('var_type') is XSOVarType.FORCING:
+        if var.metadata.get('var_type') is _FORC:
             _forcing_setup_func = var.metadata.get('setup_func')
             if _forcing_setup_func is not None:
                 forcings_dict[key] = getattr(cls, _forcing_setup_func)
@@ -247,7 +258,7 @@ def _create_index_dict(cls, var_dict):
     index_dict = defaultdict()
 
     for key, var in var_dict.items():
-        if var.metadata.get('var_type') is XSOVarType.INDEX:
+        if var.metadata.get('var_type') is _INDEX:
             index_dict[key] = var
 
     return index_dict
@@ -259,10 +270,11 @@ def _initialize_process_vars(cls, vars_dict):
     """
     process_label = cls.label
     for key, var in vars_dict.items():
-        var_type = var.metadata.get('var_type')
+        md = var.metadata
+        var_type = md.get('var_type')
 
-        if var_type is XSOVarType.VARIABLE:
-            foreign = var.metadata.get('foreign')
+        if var_type is _VAR:
+            foreign = md.get('foreign')
             if foreign is True:
                 _label = getattr(cls, key)
             elif foreign is False:
@@ -270,9 +282,9 @@ def _initialize_process_vars(cls, vars_dict):
                 _label = getattr(cls, key + '_label')
                 setattr(cls, key, cls.core.add_variable(label=_label, initial_value=_init))  # + '_value'
 
-            flux_label = var.metadata.get('flux')
-            flux_negative = var.metadata.get('negative')
-            list_input = var.metadata.get('list_input')
+            flux_label = md.get('flux')
+            flux_negative = md.get('negative')
+            list_input = md.get('list_input')
 
             if flux_label:
                 if isinstance(flux_label, list) and isinstance(flux_negative, list):
@@ -294,8 +306,8 @@ def _initialize_process_vars(cls, vars_dict):
                     else:
                         cls.core.add_flux(process_label=cls.label, var_label=_label, flux_label=flux_label,
                                           negative=flux_negative)
-        elif var_type is XSOVarType.PARAMETER:
-            if var.metadata.get('foreign') is False:
+        elif var_type is _PAR:
+            if md.get('foreign') is False:
                 _par_value = getattr(cls, key)
                 cls.core.add_parameter(label=process_label + '_' + key, value=_par_value)
             else:
@@ -308,37 +320,38 @@ def _create_flux_inputargs_dict(cls, vars_dict):
     _check_duplicate_group_arg = []
 
     for key, var in vars_dict.items():
-        var_type = var.metadata.get('var_type')
-        if var_type is XSOVarType.VARIABLE:
-            var_dim = var.metadata.get('dims')
-            if var.metadata.get('foreign') is False:
+        md = var.metadata
+        var_type = md.get('var_type')
+        if var_type is _VAR:
+            var_dim = md.get('dims')
+            if md.get('foreign') is False:
                 var_label = getattr(cls, key + '_label')
                 input_arg_dict['vars'].append({'var': key, 'label': var_label, 'dim': var_dim})
-            elif var.metadata.get('foreign') is True:
+            elif md.get('foreign') is True:
                 var_label = getattr(cls, key)
-                if var.metadata.get('list_input'):
-                    var_label = np.array(var_label)  # force to array for easier type checking later
+                if md.get('list_input'):
+                    var_label = tuple(var_label)  # force to tuple for easier type checking later
                     input_arg_dict['list_input_vars'].append({'var': key, 'label': var_label, 'dim': var_dim})
                 else:
                     input_arg_dict['vars'].append({'var': key, 'label': var_label, 'dim': var_dim})
 
-        elif var_type is XSOVarType.PARAMETER:
-            par_dim = var.metadata.get('dims')
+        elif var_type is _PAR:
+            par_dim = md.get('dims')
             # TODO: Implement foreign parameters here
             input_arg_dict['pars'].append({'var': key, 'label': cls.label + '_' + key, 'dim': par_dim})
 
-        elif var_type is XSOVarType.FORCING:
-            if var.metadata.get('foreign') is False:
+        elif var_type is _FORC:
+            if md.get('foreign') is False:
                 forc_label = getattr(cls, key + '_label')
-            elif var.metadata.get('foreign') is True:
+            elif md.get('foreign') is True:
                 forc_label = getattr(cls, key)
             else:
                 raise ValueError("Wrong argument supplied to xso.foreign, can be True or False")
             input_arg_dict['forcs'].append({'var': key, 'label': forc_label})
 
-        elif var_type is XSOVarType.FLUX:
-            flx_dim = var.metadata.get('dims')
-            group_to_arg = var.metadata.get('group_to_arg')
+        elif var_type is _FLUX:
+            flx_dim = md.get('dims')
+            group_to_arg = md.get('group_to_arg')
             if group_to_arg:
                 if group_to_arg not in _check_duplicate_group_arg:
                     _check_duplicate_group_arg.append(group_to_arg)
@@ -348,18 +361,170 @@ def _create_flux_inputargs_dict(cls, vars_dict):
     return input_arg_dict
 
 
+def _items_getter(labels):
+    """Returns function that fetches the values of all labels from a dict as tuple,
+    using a single operator.itemgetter call.
+    """
+    if len(labels) == 0:
+        return lambda mapping: ()
+    if len(labels) == 1:
+        # itemgetter with a single item does not return a tuple
+        get_item = operator.itemgetter(labels[0])
+        return lambda mapping: (get_item(mapping),)
+    return operator.itemgetter(*labels)
+
+
+def _state_getter(label):
+    """Returns getter for a single state value."""
+    def get(state, parameters, forcings):
+        return state[label]
+    return get
+
+
+def _state_list_getter(labels):
+    """Returns getter for a list of state values."""
+    get_items = _items_getter(labels)
+
+    def get(state, parameters, forcings):
+        return list(get_items(state))
+    return get
+
+
+def _list_input_getter(labels):
+    """Returns getter for state values of a list_input variable, concatenated to a flat array.
+
+    The size of the concatenated array is fixed, so the array is allocated at the
+    first call and reused as output buffer at every following call. Each flux
+    function creates its own getters, so the buffer is only passed to a single flux.
+    """
+    get_items = _items_getter(labels)
+    buffer = None
+
+    def get(state, parameters, forcings):
+        nonlocal buffer
+        values = get_items(state)
+        if buffer is None:
+            # first call probes the flux at registration, where the returned value is kept
+            buffer = np.concatenate(values, axis=None).astype(float)
+            return buffer.copy()
+        return np.concatenate(values, axis=None, out=buffer)
+    return get
+
+
+def _group_getter(labels):
+    """Returns getter for state values collected via a group_to_arg argument.
+
+    Group members are fixed after initialization, so whether the group is unpacked
+    is decided here once.
+    """
+    if len(labels) == 1:
+        # unpack list to array, for easier handling of single group arg
+        return _state_getter(labels[0])
+    return _state_list_getter(labels)
+
+
+def _parameter_getter(label):
+    """Returns getter for a single parameter value."""
+    def get(state, parameters, forcings):
+        return parameters[label]
+    return get
+
+
+def _value_getter(value):
+    """Returns getter for a value that is resolved at initialization."""
+    def get(state, parameters, forcings):
+        return value
+    return get
+
+
+def _forcing_getter(label):
+    """Returns getter for a single forcing value."""
+    def get(state, parameters, forcings):
+        return forcings[label]
+    return get
+
+
+def _create_flux_arg_getters(flux_input_args, parameters):
+    """Creates the getters that assemble the input arguments to the flux functions of a component.
+
+    The structure of the input arguments is fixed after component initialization,
+    so the type of each argument is resolved once here, instead of at every flux evaluation.
+    Parameter values registered with the model backend are resolved here as well.
+
+    Returns dict with argument name and getter function as key/value pairs.
+    """
+    getters = {}
+
+    for v_dict in flux_input_args['vars']:
+        if isinstance(v_dict['label'], (list, tuple, np.ndarray)):
+            getters[v_dict['var']] = _state_list_getter(v_dict['label'])
+        else:
+            getters[v_dict['var']] = _state_getter(v_dict['label'])
+
+    for v_dict in flux_input_args['list_input_vars']:
+        getters[v_dict['var']] = _list_input_getter(v_dict['label'])
+
+    for v_dict in flux_input_args['group_args']:
+        getters[v_dict['var']] = _group_getter(v_dict['label'])
+
+    for p_dict in flux_input_args['pars']:
+        if p_dict['label'] in parameters:
+            getters[p_dict['var']] = _value_getter(parameters[p_dict['label']])
+        else:
+            getters[p_dict['var']] = _parameter_getter(p_dict['label'])
+
+    for f_dict in flux_input_args['forcs']:
+        getters[f_dict['var']] = _forcing_getter(f_dict['label'])
+
+    return getters
+
+
+def _flux_state_labels(flux_input_args):
+    """Returns labels of all model states read by the flux functions of a component."""
+    state_labels = set()
+    for v_dict in (*flux_input_args['vars'], *flux_input_args['list_input_vars'], *flux_input_args['group_args']):
+        if isinstance(v_dict['label'], (list, tuple, np.ndarray)):
+            state_labels.update(v_dict['label'])
+        else:
+            state_labels.add(v_dict['label'])
+    return frozenset(state_labels)
+
+
+def _create_positional_getters(func, getters):
+    """Orders the argument getters by the positional arguments of a flux function.
+
+    Returns None if the signature of func can not be served by positional
+    arguments alone, i.e. if it takes *args, **kwargs or keyword-only arguments,
+    if its arguments do not match the assembled input arguments exactly, or if func
+    has no code object to inspect (e.g. functools.partial or other callable objects).
+    """
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return None
+    if code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS) or code.co_kwonlyargcount:
+        return None
+
+    # first positional argument is the component instance (self)
+    arg_names = code.co_varnames[1:code.co_argcount]
+    if len(arg_names) != len(getters) or not all(name in getters for name in arg_names):
+        return None
+
+    return tuple(getters[name] for name in arg_names)
+
+
 def _initialize_fluxes(cls, vars_dict):
     """Parses flux variables and methods in xso.component decorated class
     and registers them with the model backend.
     """
     for key, var in vars_dict.items():
-        var_type = var.metadata.get('var_type')
-        if var_type is XSOVarType.FLUX:
-            flux_func = var.metadata.get('flux_func')
-            flux_dim = var.metadata.get('dims')
+        md = var.metadata
+        var_type = md.get('var_type')
+        if var_type is _FLUX:
+            flux_func = md.get('flux_func')
+            flux_dim = md.get('dims')
             label = cls.label + '_' + flux_func.__name__
 
-            if var.metadata.get('group'):
+            if md.get('group'):
                 setattr(cls, flux_func.__name__ + '_label', label)
 
             setattr(cls, key + '_value',
@@ -373,12 +538,10 @@ def _initialize_forcings(cls, forcing_dict):
     for var, forc_input_func in forcing_dict.items():
         forc_label = getattr(cls, var + '_label')
 
-        argspec = inspect.getfullargspec(forc_input_func)
-
-        input_args = defaultdict()
-        for arg in argspec.args:
-            if arg != "self":
-                input_args[arg] = getattr(cls, arg)
+        # positional argument names are read from the code object directly,
+        # since inspect.getfullargspec fully introspects the function signature
+        code = forc_input_func.__code__
+        input_args = {arg: getattr(cls, arg) for arg in code.co_varnames[:code.co_argcount] if arg != "self"}
 
         forc_func = forc_input_func(cls, **input_args)
         setattr(cls, var + '_value',
@@ -419,9 +582,9 @@ def _get_init_stage(vars_dict):
 
     if groups_to_arg > 0:
         init_stage_automated = "fifth"
-    elif count_vars[XSOVarType.FLUX] > 0:
+    elif count_vars[_FLUX] > 0:
         init_stage_automated = "fourth"
-    elif count_vars[XSOVarType.FORCING] > 0:
+    elif count_vars[_FORC] > 0:
         init_stage_automated = "third"
     else:
         init_stage_automated = "second"
@@ -486,39 +649,23 @@ def component(cls=None):
         def flux_decorator(self, func):
             """XSO flux function decorator to unpack arguments"""
 
-            @wraps(func)
-            def unpack_args(**kwargs):
-                state = kwargs.get('state')
-                parameters = kwargs.get('parameters')
-                forcings = kwargs.get('forcings')
-
-                input_args = {}
+            # getters are created per flux, so list input buffers are not shared between fluxes
+            getters = _create_flux_arg_getters(self.flux_input_args, self.core.model.parameters)
+            positional_getters = _create_positional_getters(func, getters)
 
-                for v_dict in self.flux_input_args['vars']:
-                    if isinstance(v_dict['label'], list) or isinstance(v_dict['label'], np.ndarray):
-                        input_args[v_dict['var']] = [state[label] for label in v_dict['label']]
-                    else:
-                        input_args[v_dict['var']] = state[v_dict['label']]
-
-                for v_dict in self.flux_input_args['list_input_vars']:
-                    input_args[v_dict['var']] = np.concatenate([state[label] for label in v_dict['label']],
-                                                               axis=None)
-
-                for v_dict in self.flux_input_args['group_args']:
-                    states = [state[label] for label in v_dict['label']]
-                    if len(states) == 1:
-                        # unpack list to array, for easier handling of single group arg
-                        input_args[v_dict['var']] = states[0]
-                    else:
-                        input_args[v_dict['var']] = [state[label] for label in v_dict['label']]
-
-                for p_dict in self.flux_input_args['pars']:
-                    input_args[p_dict['var']] = parameters[p_dict['label']]
+            if positional_getters is None:
+                keyword_getters = tuple(getters.items())
 
-                for f_dict in self.flux_input_args['forcs']:
-                    input_args[f_dict['var']] = forcings[f_dict['label']]
+                @wraps(func)
+                def unpack_args(state=None, parameters=None, forcings=None):
+                    return func(self, **{var: get(state, parameters, forcings) for var, get in keyword_getters})
+            else:
+                @wraps(func)
+                def unpack_args(state=None, parameters=None, forcings=None):
+                    return func(self, *[get(state, parameters, forcings) for get in positional_getters])
 
-                return func(self, **input_args)
+            # model states read by flux, used by the model backend to find independent fluxes
+            unpack_args.state_labels = _flux_state_labels(self.flux_input_args)
 
             return unpack_args
 
@@ -546,13 +693,11 @@ def component(cls=None):
         process_cls = xs.process(new_cls)
 
         # allow passing helper functions through to process class
-        _forcing_input_functions = [value.__name__ for value in forcing_dict.values()]
-        cls_dir = dir(cls)
-        for attribute in cls_dir:
-            if hasattr(cls, attribute) and callable(getattr(cls, attribute)):
-                if not attribute.startswith("__") and attribute not in _forcing_input_functions:
-                    # Allow setting custom attr method, to be used in component
-                    setattr(process_cls, attribute, getattr(cls, attribute))
+        _forcing_input_functions = {value.__name__ for value in forcing_dict.values()}
+        for attribute, value in inspect.getmembers(cls, callable):
+            if not attribute.startswith("__") and attribute not in _forcing_input_functions:
+                # Allow setting custom attr method, to be used in component
+                setattr(process_cls, attribute, value)
 
         return process_cls
 
@@ -1,9 +1,16 @@
+import logging
 import time as tm
+from collections import namedtuple
 
 from xso.model import Model
-from xso.solvers import SolverABC, IVPSolver, StepwiseSolver
+from xso.solvers import SolverABC, IVPSolver, ODEINTSolver, StepwiseSolver
 
-_built_in_solvers = {'solve_ivp': IVPSolver, 'stepwise': StepwiseSolver}
+logger = logging.getLogger(__name__)
+
+_built_in_solvers = {'solve_ivp': IVPSolver, 'odeint': ODEINTSolver, 'stepwise': StepwiseSolver}
+
+# connection of a flux to the variable(s) it is applied to, stored in Model.fluxes_per_var
+FluxVar = namedtuple('FluxVar', 'label negative list_input')
 
 
 class XSOCore:
@@ -19,15 +26,18 @@ class XSOCore:
     switching or modifying either component.
     """
 
-    def __init__(self, solver):
+    def __init__(self, solver, flux_workers=0):
         """
         Initializes XSO Model and XSO Solver, and stores solve start and end for diagnostics.
 
         Parameters
         ----------
-        solver : {'stepwise', 'solve_ivp'} or subclass of SolverABC
+        solver : {'stepwise', 'solve_ivp', 'odeint'} or subclass of SolverABC
            Solver name as str, has to be built into xso.
            Alternatively can be passed a custom subclass of xso.solver.SolverABC.
+        flux_workers : int, optional
+           Number of threads used to evaluate independent fluxes in parallel,
+           default is 0, which evaluates all fluxes sequentially.
         """
         self.solve_start = None
         self.solve_end = None
@@ -36,13 +46,14 @@ class XSOCore:
             try:
                 self.solver = _built_in_solvers[solver]()
             except KeyError:
-                raise KeyError("Solver name passed is not built-in. Please choose from: 'stepwise', 'solve_ivp'.")
+                raise KeyError("Solver name passed is not built-in. Please choose from: 'stepwise', 'solve_ivp', 'odeint'.")
         elif isinstance(solver, SolverABC):
             self.solver = solver
         else:
             raise Exception("Solver argument passed to model is not built-in or subclass of SolverABC.")
 
         self.model = Model()
+        self.model.flux_workers = flux_workers
 
     def add_variable(self, label, initial_value=0):
         """Adding a variable to the model.
@@ -86,9 +97,7 @@ class XSOCore:
         """Method to add a flux with the model backend, via implemented function in Solver."""
         # to store var - flux connection:
         label = process_label + '_' + flux_label
-        flux_var_dict = {'label': label, 'negative': negative, 'list_input': list_input}
-
-        self.model.fluxes_per_var[var_label].append(flux_var_dict)
+        self.model.fluxes_per_var[var_label].append(FluxVar(label, negative, list_input))
 
     def add_forcing(self, label, forcing_func):
         """Method to register add forcing with the model backend, via implemented function in Solver."""
@@ -99,6 +108,7 @@ class XSOCore:
     def assemble(self):
         """Method to assemble model upon full initialization, necessary for some solvers."""
         self.solver.assemble(self.model)
+        self.model.finalize_layout()
         # start measuring solve time:
         self.solve_start = tm.time()
 
@@ -106,13 +116,21 @@ class XSOCore:
         """Method to start model solve, calls appropriate function in Solver."""
         if self.model.time is None:
             raise Exception('Time needs to be supplied to Model before solve')
-        self.solver.solve(self.model, time_step)
+        solved = False
+        try:
+            self.solver.solve(self.model, time_step)
+            solved = True
+        finally:
+            # release flux worker threads if solve fails, the model run is aborted
+            if not solved:
+                self.model.cleanup()
 
     def cleanup(self):
         """Method to remove temporary files after solving, necessary for some solvers."""
-        # stop measuring solver time:
-        self.solve_end = tm.time()
-        # TODO: diagnostic print here
-        #print(f"Model was solved in {round(self.solve_end - self.solve_start, 5)} seconds")
         self.solver.cleanup()
+        self.model.cleanup()
+        # stop measuring solver time, model is not assembled if initialization failed:
+        self.solve_end = tm.time()
+        if self.solve_start is not None:
+            logger.debug("Model was solved in %.5f seconds", self.solve_end - self.solve_start)
 
@@ -1,16 +1,19 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import numpy as np
 
 
-def return_dim_ndarray(value):
-    """Helper function to always have at least 1d numpy array returned."""
-    if isinstance(value, list):
-        return np.array(value)
-    elif isinstance(value, np.ndarray):
-        return value
-    else:
-        return np.array([value])
+@lru_cache(maxsize=32)
+def _compile_flux_source(source):
+    """Helper function to compile the source of a generated flux evaluation function.
+
+    The source depends on the number and labels of the fluxes, which are written back
+    to the state, so the code object is shared between models with the same fluxes,
+    e.g. runs of a parameter sweep.
+    """
+    return compile(source, '<xso fluxes>', 'exec')
 
 
 class Model:
@@ -28,6 +31,9 @@ class Model:
         """
         self.time = None
 
+        # number of threads used to evaluate independent fluxes in parallel, 0 evaluates sequentially
+        self.flux_workers = 0
+
         self.variables = defaultdict()
         self.parameters = defaultdict()
 
@@ -42,6 +48,26 @@ class Model:
         self.flux_dims = defaultdict()
         self.full_model_dims = defaultdict()
 
+        self._unpack_plan = ()
+        self._unpack_scalars = ()
+        self._unpack_vectors = ()
+        self._unpack_tensors = ()
+        self._total_len = 0
+        self._out_buf = None
+        self._state_len = 0
+        self._flux_views = {}
+        self._flux_calls = ()
+        self._forcing_funcs = ()
+        self._evaluate_fluxes = None
+        self._flux_pool = None
+        self._route_flux_ids = np.array([], dtype=int)
+        self._route_var_ids = np.array([], dtype=int)
+        self._route_signs = np.array([], dtype=float)
+        self._route_buf = np.array([], dtype=float)
+        self._forcing_time = None
+        self._forcing_now = {}
+        self._state_dict = {}
+
     def __repr__(self):
         """Simple repr implementation that prints model components"""
         return (f"Model contains: \n"
@@ -51,30 +77,279 @@ class Model:
                 f"Fluxes:{[flx for flx in self.fluxes]} \n"
                 f"Full Model Dimensions:{[(state, dim) for state, dim in self.full_model_dims.items()]} \n")
 
-    def unpack_flat_state(self, flat_state):
-        """Function called at the beginning of the model_function, to convert array
-        of model values into a labeled dictionary. This allows for easier calculations,
-        and ensures compatibility to most solving algorithms.
+    def finalize_layout(self):
+        """Function called once the model is assembled and all dimensions are known.
+
+        Computes the position and shape of each variable and flux within the flat model state,
+        and resolves the routing of all fluxes, including list input fluxes, to the variables
+        they apply to, so that model_function does not need to repeat this at every evaluation.
         """
-        state_dict = defaultdict()
+        self._unpack_plan = []
         index = 0
         for key, dims in self.full_model_dims.items():
             if dims is None:
-                state_dict[key] = flat_state[index]
+                self._unpack_plan.append((key, index, index + 1, None))
                 index += 1
             elif isinstance(dims, int):
-                state_dict[key] = flat_state[index:index + dims]
+                self._unpack_plan.append((key, index, index + dims, dims))
                 index += dims
             else:
-                _length = np.prod(dims)
-                state_dict[key] = flat_state[index:index + _length].reshape(dims)
+                _length = int(np.prod(dims))
+                self._unpack_plan.append((key, index, index + _length, tuple(dims)))
                 index += _length
+        self._total_len = index
+        self._unpack_plan = tuple(self._unpack_plan)
+
+        # specialize unpacking by shape, so that unpack_flat_state does not branch per key
+        self._unpack_scalars = tuple((key, start) for key, start, stop, shape in self._unpack_plan
+                                     if shape is None)
+        self._unpack_vectors = tuple((key, slice(start, stop)) for key, start, stop, shape in self._unpack_plan
+                                     if isinstance(shape, int))
+        self._unpack_tensors = tuple((key, slice(start, stop), shape) for key, start, stop, shape in self._unpack_plan
+                                     if isinstance(shape, tuple))
+
+        # the model output has the same layout as the flat model state
+        self._out_buf = np.empty(self._total_len)
+        # derivatives of variables are accumulated into the first section of the output,
+        # so the flat model state needs to list all variables before all fluxes
+        n_vars = len(self.variables)
+        if set(list(self.full_model_dims)[:n_vars]) != set(self.variables):
+            raise Exception("Full model dimensions need to list all variables before fluxes, "
+                            "check the assemble method of the solver")
+        out_slices = {key: slice(start, stop) for key, start, stop, shape in self._unpack_plan}
+        self._state_len = sum(out_slices[key].stop - out_slices[key].start for key in self.variables)
+
+        # flux values are written to views of their section of the output buffer,
+        # shaped like the flux value:
+        self._flux_views = {}
+        for key, start, stop, shape in self._unpack_plan:
+            if key in self.fluxes:
+                self._flux_views[key] = self._out_buf[start:stop].reshape(shape or (1,))
+
+        # flux values with dimensions are lists or arrays, so the conversion
+        # to ndarray is resolved once per flux here, instead of at every evaluation
+        self._flux_calls = []
+        for flx_label, flux in self.fluxes.items():
+            to_ndarray = np.asarray if self.full_model_dims[flx_label] else np.ravel
+            self._flux_calls.append((flx_label, flux, to_ndarray, self._flux_views[flx_label]))
+        self._flux_calls = tuple(self._flux_calls)
+        self._forcing_funcs = tuple(self.forcing_func.items())
+        # shut down the thread pool of a previous assembly, before creating a new one
+        self.cleanup()
+        if self.flux_workers:
+            self._evaluate_fluxes = self._create_parallel_flux_evaluation()
+        else:
+            self._evaluate_fluxes = self._compile_flux_evaluation()
+
+        self._build_routing_tables()
+
+        self._forcing_time = None
+        self._forcing_now = {}
+        self._state_dict = {}
+
+    def _compile_flux_evaluation(self):
+        """Generates a function that evaluates all fluxes in a single straight-line body.
+
+        The order of fluxes, their conversion to ndarray and the output views are fixed
+        after assembly, so these are unrolled into the source of the generated function,
+        instead of being looked up in a loop at every evaluation. Every flux is part of
+        the flat model state, so each value is written back to the state as well.
+        """
+        namespace = {'copyto': np.copyto}
+        lines = ['def evaluate_fluxes(state, parameters, forcings):']
+        for i, (flx_label, flux, to_ndarray, view) in enumerate(self._flux_calls):
+            namespace[f'flux_{i}'] = flux
+            namespace[f'to_ndarray_{i}'] = to_ndarray
+            namespace[f'view_{i}'] = view
+            lines.append(f'    value = to_ndarray_{i}(flux_{i}(state=state, parameters=parameters, forcings=forcings))')
+            lines.append(f'    copyto(view_{i}, value)')
+            lines.append(f'    state[{flx_label!r}] = value')
+        lines.append('    return None')
+
+        exec(_compile_flux_source('\n'.join(lines)), namespace)
+        return namespace['evaluate_fluxes']
+
+    def _flux_levels(self):
+        """Sorts fluxes into levels, fluxes within one level can be evaluated independently.
+
+        Fluxes are evaluated in order of registration and write their value to the state,
+        so a flux reading the state value of another flux has to run after it, if that flux
+        was registered earlier, and before it otherwise. Flux functions that do not declare
+        the states they read (via a state_labels attribute) are evaluated on their own level.
+        """
+        flux_index = {label: i for i, (label, flux, to_ndarray, view) in enumerate(self._flux_calls)}
+        levels = []
+        barrier = 0
+        for i, (flx_label, flux, to_ndarray, view) in enumerate(self._flux_calls):
+            state_labels = getattr(flux, 'state_labels', None)
+            if state_labels is None:
+                level = max(levels, default=-1) + 1
+                barrier = level + 1
+            else:
+                level = barrier
+                for label in state_labels:
+                    j = flux_index.get(label)
+                    if j is not None and j < i:
+                        level = max(level, levels[j] + 1)
+                # fluxes registered earlier, that read the state value of this flux:
+                for j in range(i):
+                    other_labels = getattr(self._flux_calls[j][1], 'state_labels', ())
+                    if flx_label in other_labels:
+                        level = max(level, levels[j] + 1)
+            levels.append(level)
+
+        flux_levels = defaultdict(list)
+        for flux_call, level in zip(self._flux_calls, levels):
+            flux_levels[level].append(flux_call)
+        return tuple(tuple(flux_levels[level]) for level in sorted(flux_levels))
+
+    def _create_parallel_flux_evaluation(self):
+        """Creates a function that evaluates independent fluxes in parallel using a thread pool.
+
+        NumPy releases the GIL within most array operations, so fluxes doing
+        substantial array computations can run concurrently. For small models the
+        thread overhead outweighs this, so it is only used if flux_workers is set.
+        """
+        flux_levels = self._flux_levels()
+        self._flux_pool = ThreadPoolExecutor(max_workers=self.flux_workers)
+        pool = self._flux_pool
+
+        def evaluate_fluxes(state, parameters, forcings):
+            def evaluate(flux_call):
+                flx_label, flux, to_ndarray, view = flux_call
+                value = to_ndarray(flux(state=state, parameters=parameters, forcings=forcings))
+                np.copyto(view, value)
+                return flx_label, value
+
+            for level in flux_levels:
+                if len(level) == 1:
+                    results = [evaluate(level[0])]
+                else:
+                    results = pool.map(evaluate, level)
+                # flux values are written to the state after the whole level is evaluated,
+                # so that no flux of this level reads a value updated in this evaluation
+                for flx_label, value in results:
+                    state[flx_label] = value
+
+        return evaluate_fluxes
+
+    @property
+    def state_size(self):
+        """Size of the flat model state, of all variables and fluxes, after finalize_layout."""
+        return self._total_len
+
+    def rhs_state_indices(self):
+        """Returns indices of the flat model state that the model function depends on.
+
+        These are all variables, and fluxes that are read from the state by a flux function
+        before their value is computed in the same evaluation. All other fluxes are only
+        stored in the flat state, so the derivatives do not depend on them. If any flux
+        function does not declare the states it reads, all indices are returned.
+        """
+        read_labels = set(self.variables)
+        computed = set()
+        for flx_label, flux, to_ndarray, view in self._flux_calls:
+            state_labels = getattr(flux, 'state_labels', None)
+            if state_labels is None:
+                return np.arange(self._total_len)
+            read_labels.update(label for label in state_labels
+                               if label in self.fluxes and label not in computed)
+            computed.add(flx_label)
+
+        return np.concatenate([np.arange(start, stop) for key, start, stop, shape in self._unpack_plan
+                               if key in read_labels] or [np.array([], dtype=int)])
+
+    def cleanup(self):
+        """Releases the thread pool used for parallel flux evaluation, if any."""
+        if self._flux_pool is not None:
+            self._flux_pool.shutdown()
+            self._flux_pool = None
+
+    def _build_routing_tables(self):
+        """Flattens the routing of flux values to variables into three parallel index arrays.
+
+        Each entry adds the flux value at position flux_id of the flat model output
+        with sign (-1 or 1) to the variable at position var_id. Fluxes applied to scalar
+        variables are summed, fluxes applied to variables with dimensions are broadcast
+        to the variable shape.
+        """
+        positions = {}
+        for key, start, stop, shape in self._unpack_plan:
+            positions[key] = np.arange(start, stop).reshape(shape or (1,))
+
+        flux_ids, var_ids, signs = [], [], []
+
+        def add_route(var_label, _flux_ids, negative):
+            if var_label not in self.variables:
+                return
+            _var_ids = positions[var_label]
+            if self.full_model_dims[var_label]:
+                _flux_ids = np.broadcast_to(_flux_ids, _var_ids.shape)
+            else:
+                _var_ids = np.broadcast_to(_var_ids[0], np.shape(_flux_ids))
+            flux_ids.append(np.ravel(_flux_ids))
+            var_ids.append(np.ravel(_var_ids))
+            signs.append(np.full(np.size(_flux_ids), -1. if negative else 1.))
+
+        for var_label in self.variables:
+            if var_label in self.fluxes_per_var:
+                for flux_var in self.fluxes_per_var[var_label]:
+                    flux_label, negative, list_input = flux_var
+                    add_route(var_label, positions[flux_label], negative)
+
+        # elements of list input fluxes are gathered from the flat flux value, either one
+        # element per variable or consecutive sections matching the variable sizes
+        for flux_var in self.fluxes_per_var.get("list_input", ()):
+            flux_label, negative, list_input = flux_var
+            flux_dims = self.full_model_dims[flux_label]
+            flat_flux_ids = np.ravel(positions[flux_label])
+            list_var_dims = [self.full_model_dims[var] or 1 for var in list_input]
+            if len(list_input) == flux_dims:
+                for i, var in enumerate(list_input):
+                    add_route(var, flat_flux_ids[i], negative)
+            elif sum(list_var_dims) == flux_dims:
+                sections = np.split(flat_flux_ids, np.cumsum(list_var_dims[:-1]))
+                for var, _flux_ids in zip(list_input, sections):
+                    add_route(var, _flux_ids, negative)
+            else:
+                raise Exception("ERROR: list input vars dims and flux output dims do not match")
+
+        if flux_ids:
+            self._route_flux_ids = np.concatenate(flux_ids)
+            self._route_var_ids = np.concatenate(var_ids)
+            self._route_signs = np.concatenate(signs)
+        else:
+            self._route_flux_ids = np.array([], dtype=int)
+            self._route_var_ids = np.array([], dtype=int)
+            self._route_signs = np.array([], dtype=float)
+
+        # accumulator for the signed flux contributions, reused at every evaluation
+        self._route_buf = np.empty(np.size(self._route_flux_ids))
+
+    def unpack_flat_state(self, flat_state, state_dict=None):
+        """Function called at the beginning of the model_function, to convert array
+        of model values into a labeled dictionary. This allows for easier calculations,
+        and ensures compatibility to most solving algorithms.
+
+        If state_dict is supplied, it is filled in place instead of creating a new dict.
+        """
+        if state_dict is None:
+            state_dict = {}
+        for key, index in self._unpack_scalars:
+            state_dict[key] = flat_state[index]
+        for key, sl in self._unpack_vectors:
+            state_dict[key] = flat_state[sl]
+        for key, sl, shape in self._unpack_tensors:
+            state_dict[key] = flat_state[sl].reshape(shape)
         return state_dict
 
     def model_function(self, time=None, current_state=None, forcing=None):
         """ General model function that computes forcings and fluxes.
         Is called within solve function of Solver.
 
+        Returns a new array at every call, see compute_derivatives for
+        solvers that copy the returned values immediately.
+
         Parameters
         __________
         current_state : numpy array
@@ -87,93 +362,42 @@ class Model:
             evaluates current time step value and passes that as dict.
         """
 
+        # solvers might keep references to previously returned arrays (e.g. RK45 of solve_ivp)
+        return self.compute_derivatives(time, current_state, forcing).copy()
+
+    def compute_derivatives(self, time=None, current_state=None, forcing=None):
+        """Computes forcings and fluxes like model_function, but returns the internal output buffer.
+
+        The returned array is overwritten at the next call, so this can only be used
+        by solvers that copy the values before evaluating the model again
+        (e.g. scipy.integrate.odeint, which copies them into its Fortran work array).
+        Parameters are the same as for model_function.
+        """
         # unpack flat state:
-        state = self.unpack_flat_state(current_state)
+        state = self.unpack_flat_state(current_state, self._state_dict)
 
         # Return forcings for time point:
         if time is not None:
-            forcing_now = defaultdict()
-            for key, func in self.forcing_func.items():
-                forcing_now[key] = func(time)
-            forcing = forcing_now
+            # solvers commonly evaluate the model repeatedly at the same time point
+            # (e.g. last stage and step end of RK45), so forcings are only recomputed for a new time
+            if time != self._forcing_time:
+                forcing_now = self._forcing_now
+                for key, func in self._forcing_funcs:
+                    forcing_now[key] = func(time)
+                self._forcing_time = time
+            forcing = self._forcing_now
         elif forcing is None:
             forcing = self.forcings
 
-        # Compute fluxes:
-        flux_values = defaultdict()
-        fluxes_out = []
-        for flx_label, flux in self.fluxes.items():
-            _value = return_dim_ndarray(flux(state=state, parameters=self.parameters, forcings=forcing))
-            flux_values[flx_label] = _value
-            fluxes_out.append(_value)
-            if flx_label in state:
-                state.update({flx_label: _value})
-
-        # Route list input fluxes:
-        list_input_fluxes = defaultdict(list)
-        for flux_var_dict in self.fluxes_per_var["list_input"]:
-            flux_label, negative, list_input = flux_var_dict.values()
-            flux_val = flux_values[flux_label]
-            flux_dims = self.full_model_dims[flux_label]
-            list_var_dims = []
-            for var in list_input:
-                _dim = self.full_model_dims[var]
-                list_var_dims.append(_dim or 1)
-            if len(list_input) == flux_dims:
-                for var, flux in zip(list_input, flux_val):
-                    if negative:
-                        list_input_fluxes[var].append(-flux)
-                    else:
-                        list_input_fluxes[var].append(flux)
-            elif sum(list_var_dims) == flux_dims:
-                _dim_counter = 0
-                for var, dims in zip(list_input, list_var_dims):
-                    flux = flux_val[_dim_counter:_dim_counter + dims]
-                    _dim_counter += dims
-                    if negative:
-                        list_input_fluxes[var].append(-flux)
-                    else:
-                        list_input_fluxes[var].append(flux)
-            else:
-                raise Exception("ERROR: list input vars dims and flux output dims do not match")
-
-        # Assign fluxes to variables:
-        state_out = []
-        for var_label, value in self.variables.items():
-            var_fluxes = []
-            dims = self.full_model_dims[var_label]
-            flux_applied = False
-            if var_label in self.fluxes_per_var:
-                flux_applied = True
-                for flux_var_dict in self.fluxes_per_var[var_label]:
-                    flux_label, negative, list_input = flux_var_dict.values()
-                    if dims:
-                        _flux = flux_values[flux_label]
-                    else:
-                        _flux = np.sum(flux_values[flux_label])
-                    if negative:
-                        var_fluxes.append(-_flux)
-                    else:
-                        var_fluxes.append(_flux)
-            if var_label in list_input_fluxes:
-                flux_applied = True
-                for flux in list_input_fluxes[var_label]:
-                    if dims:
-                        _flux = flux
-                    else:
-                        _flux = np.sum(flux)
-                    var_fluxes.append(_flux)
-            if not flux_applied:
-                dims = self.full_model_dims[var_label]
-                if dims:
-                    var_fluxes.append(np.array([0 for i in range(dims)]))
-                else:
-                    var_fluxes.append(0)
-
-            state_out.append(np.sum(var_fluxes, axis=0))
+        # Compute fluxes, into the preallocated output buffer:
+        full_output = self._out_buf
+        self._evaluate_fluxes(state, self.parameters, forcing)
 
-        # flatten state again:
-        full_output = np.concatenate([[v for val in state_out for v in val.ravel()],
-                                      [v for val in fluxes_out for v in val.ravel()]], axis=None)
+        # Assign fluxes to variables, summing all routed flux values per variable element
+        # (minlength ensures that elements of variables without any flux are zero):
+        contributions = np.take(full_output, self._route_flux_ids, out=self._route_buf)
+        np.multiply(contributions, self._route_signs, out=contributions)
+        full_output[:self._state_len] = np.bincount(self._route_var_ids, weights=contributions,
+                                                    minlength=self._state_len)
 
         return full_output
@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
+import logging
 from collections import defaultdict
+from itertools import chain
 
 import numpy as np
 import math
 
-from scipy.integrate import solve_ivp
+from scipy.integrate import solve_ivp, odeint
+
+logger = logging.getLogger(__name__)
 
 
 def to_ndarray(value):
@@ -17,6 +21,25 @@ def to_ndarray(value):
         return np.array([value])
 
 
+def storage_dims(value, model_time):
+    """Helper function returning the dims of a value, as stored in the model,
+    and the full dimensions of its storage array over model time.
+
+    Dims are None for single values, the size for 1D arrays and the shape otherwise.
+    """
+    shape = np.shape(value)
+    if math.prod(shape) == 1:
+        _dims = None
+        full_dims = (np.size(model_time),)
+    elif len(shape) == 1:
+        _dims = shape[0]
+        full_dims = (_dims, np.size(model_time))
+    else:
+        _dims = shape
+        full_dims = (*shape, np.size(model_time))
+    return _dims, full_dims
+
+
 class SolverABC(ABC):
     """Abstract base class of backend solver class,
     use subclass to solve model within the XSO framework.
@@ -75,9 +98,15 @@ class SolverABC(ABC):
         pi = np.pi  # pi constant
         e = np.e  # e constant
 
-        def exp(x):
-            """Exponential function"""
-            return np.exp(x)
+        # numpy functions are bound directly, to avoid an additional
+        # Python function call at every use within flux functions:
+        exp = np.exp  # Exponential function
+        log = np.log  # Logarithmic function
+        sum = np.sum  # Sum function
+        min = np.minimum  # Minimum function
+        max = np.maximum  # Maximum function
+        abs = np.abs  # Absolute value function
+        sin = np.sin  # Sine function
 
         # add np.errstate to ignore superfluous warnings, caused by solve_ivp solver
         @np.errstate(all='ignore')
@@ -85,34 +114,10 @@ class SolverABC(ABC):
             """Square root function"""
             return np.sqrt(x)
 
-        def log(x):
-            """Logarithmic function """
-            return np.log(x)
-
         def product(x):  # no axis?
             """Product function"""
             return math.prod(x)
 
-        def sum(x, axis=None):
-            """ Sum function"""
-            return np.sum(x, axis=axis)
-
-        def min(x1, x2):
-            """ Minimum function """
-            return np.minimum(x1, x2)
-
-        def max(x1, x2):
-            """ Maximum function """
-            return np.maximum(x1, x2)
-
-        def abs(x):
-            """ Absolute value function """
-            return np.abs(x)
-
-        def sin(x):
-            """ Sine function """
-            return np.sin(x)
-
 
 class IVPSolver(SolverABC):
     """Solver backend using scipy.integrate.solve_ivp to solve model.
@@ -126,23 +131,23 @@ class IVPSolver(SolverABC):
     def __init__(self):
         self.var_init = defaultdict()
         self.flux_init = defaultdict()
+        # initial model state, extended with every registered variable and flux:
+        self._init_state = defaultdict()
+        # forcing values at time 0, evaluated once when each forcing is added:
+        self._init_forcings = defaultdict()
+        self._layout = ()
+        self._flux_rows_start = 0
+        self._var_rows = ()
+        self._flux_rows = ()
 
     @staticmethod
     def return_dims_and_array(value, model_time):
         """Helper function to expand numpy array to appropriate size
         for odeint solver based on value and model time.
         """
-        if np.size(value) == 1:
-            _dims = None
-            full_dims = (np.size(model_time),)
-        elif len(np.shape(value)) == 1:
-            _dims = np.size(value)
-            full_dims = (_dims, np.size(model_time))
-        else:
-            _dims = np.shape(value)
-            full_dims = (*_dims, np.size(model_time))
-
-        array_out = np.zeros(full_dims)
+        _dims, full_dims = storage_dims(value, model_time)
+        # every time point is assigned from the solver output in solve:
+        array_out = np.empty(full_dims)
         return array_out, _dims
 
     def add_variable(self, label, initial_value, model):
@@ -153,6 +158,7 @@ class IVPSolver(SolverABC):
 
         # store initial values of variables to pass to odeint function
         self.var_init[label] = to_ndarray(initial_value)
+        self._init_state[label] = self.var_init[label]
 
         array_out, dims = self.return_dims_and_array(initial_value, model.time)
 
@@ -170,20 +176,11 @@ class IVPSolver(SolverABC):
         if model.time is None:
             raise Exception("To use ODEINT solver, model time needs to be supplied before adding fluxes")
 
-        var_in_dict = defaultdict()
-        for var, value in model.variables.items():
-            var_in_dict[var] = self.var_init[var]
-        for var, value in self.flux_init.items():
-            var_in_dict[var] = value
-
-        forcing_init = defaultdict()
-        for key, func in model.forcing_func.items():
-            forcing_init[key] = func(0)
-
-        _flux_value = to_ndarray(flux(state=var_in_dict,
+        _flux_value = to_ndarray(flux(state=self._init_state,
                                       parameters=model.parameters,
-                                      forcings=forcing_init))
+                                      forcings=self._init_forcings))
         self.flux_init[label] = _flux_value
+        self._init_state[label] = _flux_value
 
         array_out, dims = self.return_dims_and_array(_flux_value, model.time)
 
@@ -193,6 +190,7 @@ class IVPSolver(SolverABC):
 
     def add_forcing(self, label, forcing_func, model):
         """Compute forcing for model time."""
+        self._init_forcings[label] = forcing_func(0)
         return forcing_func(model.time)
 
     def assemble(self, model):
@@ -204,74 +202,127 @@ class IVPSolver(SolverABC):
         for flx_key, dim in model.flux_dims.items():
             model.full_model_dims[flx_key] = dim
 
-        # TODO: diagnostic print here
-        # print model repr for diagnostic purposes:
-        # print("Model is assembled!")
-        # print(model)
+        # rows of the solver output belonging to each variable and flux:
+        self._layout = []
+        index = 0
+        for key, dims in model.full_model_dims.items():
+            size = 1 if dims is None else int(np.prod(dims))
+            self._layout.append((key, index, index + size, dims))
+            index += size
+        self._layout = tuple(self._layout)
+
+        # flat initial state, filled from the variable and flux initial values at solve time:
+        self._full_init = np.empty(index)
+
+        # full_model_dims lists variables first, so flux rows form one block at the end of the output:
+        self._flux_rows_start = sum(stop - start for key, start, stop, dims in self._layout
+                                    if key in model.var_dims)
+
+        # storage arrays with their rows in the solver output and in the flux block, in fixed order:
+        self._var_rows = tuple((model.variables[key], start, stop)
+                               for key, start, stop, dims in self._layout if key in model.variables)
+        self._flux_rows = tuple((model.flux_values[key], start - self._flux_rows_start, stop - self._flux_rows_start)
+                                for key, start, stop, dims in self._layout if key in model.flux_values)
+
+        logger.debug("Model is assembled:\n%s", model)
+
+    def integrate(self, model, full_init):
+        """Integrate flat model state over model time using scipy.integrate.solve_ivp.
+
+        Returns array of model state with shape (state size, time size).
+        """
+        full_model_out = solve_ivp(model.model_function,
+                                   t_span=[model.time[0], model.time[-1]],
+                                   y0=full_init,
+                                   t_eval=model.time)
+        return full_model_out.y
 
     def solve(self, model, time_step):
         """Solve model using scipy.integrate.solve_ivp, passing model_function, initial values and model.time.
         The model output is then assigned to the previously initialized storage arrays within xsimlab backend.
         """
-        # convert all initial values to a 1D array:
-        full_init = np.concatenate([[v for val in self.var_init.values() for v in val.ravel()],
-                                    [v for val in self.flux_init.values() for v in val.ravel()]], axis=None)
+        # copy all initial values into the 1D initial state array:
+        full_init = self._full_init
+        for (key, start, stop, dims), value in zip(self._layout,
+                                                   chain(self.var_init.values(), self.flux_init.values())):
+            full_init[start:stop] = value.ravel()
 
         # solving model here:
-        full_model_out = solve_ivp(model.model_function,
-                                   t_span=[model.time[0], model.time[-1]],
-                                   y0=full_init,
-                                   t_eval=model.time)
+        full_model_out = self.integrate(model, full_init)
 
         # round off 1e150-th decimal to remove floating point numerical errors
-        state_rows = [row for row in np.around(full_model_out.y, decimals=150)]
-
-        # unpack and reshape state array to appropriate dimensions:
-        state_dict = defaultdict()
-        index = 0
-        for key, dims in model.full_model_dims.items():
-            if dims is None:
-                state_dict[key] = state_rows[index]
-                index += 1
-            elif isinstance(dims, int):
-                val_list = []
-                for i in range(dims):
-                    val_list.append(state_rows[index])
-                    index += 1
-                state_dict[key] = np.array(val_list)
-            else:
-                full_dims = (*dims, np.size(model.time))
-                _length = int(np.prod(dims))
-                val_list = []
-                for i in range(_length):
-                    val_list.append(state_rows[index])
-                    index += 1
-
-                state_dict[key] = np.array(val_list).reshape(full_dims)
+        full_model_out = np.around(full_model_out, decimals=150)
 
         # assign solved model state to value storage in xsimlab framework:
-        for var_key, val in model.variables.items():
-            val[...] = state_dict[var_key]
+        for val, start, stop in self._var_rows:
+            val[...] = full_model_out[start:stop].reshape(val.shape)
 
-        for flux_key, val in model.flux_values.items():
-            state = state_dict[flux_key]
-            dims = model.full_model_dims[flux_key]
+        # flux values are reconstructed from the integrated flux rows, as differences
+        # between time points, computed for all fluxes at once:
+        flux_rows = full_model_out[self._flux_rows_start:]
+        flux_rates = np.empty_like(flux_rows)
+        np.subtract(flux_rows[:, 1:], flux_rows[:, :-1], out=flux_rates[:, 1:])
+        flux_rates[:, 1:] /= time_step
+        # first time point repeats the first difference:
+        flux_rates[:, 0] = flux_rates[:, 1]
 
-            difference = np.diff(state) / time_step
-
-            if dims:
-                if isinstance(dims, tuple):
-                    val[...] = np.concatenate((difference[..., 0][..., np.newaxis], difference), axis=len(dims))
-                else:
-                    val[...] = np.hstack((difference[..., 0][:, None], difference))
-            else:
-                val[...] = np.hstack((difference[0], difference))
+        for val, start, stop in self._flux_rows:
+            val[...] = flux_rates[start:stop].reshape(val.shape)
 
     def cleanup(self):
         """Empty cleanup method, not necessary for this solver."""
         pass
 
 
+class ODEINTSolver(IVPSolver):
+    """Solver backend using scipy.integrate.odeint to solve model.
+
+    ODEINT wraps the LSODA algorithm of the Fortran library ODEPACK, which
+    automatically switches between non-stiff (Adams) and stiff (BDF) methods.
+    The integration loop runs in compiled code, calling back to the model function
+    only for evaluation of the derivatives.
+    """
+
+    def integrate(self, model, full_init):
+        """Integrate flat model state over model time using scipy.integrate.odeint.
+
+        Returns array of model state with shape (state size, time size).
+        """
+        # odeint copies the derivatives at every evaluation, so the output buffer can be reused
+        full_model_out = odeint(model.compute_derivatives,
+                                y0=full_init,
+                                t=model.time,
+                                Dfun=self.jacobian_function(model),
+                                tfirst=True)
+        return full_model_out.T
+
+    @staticmethod
+    def jacobian_function(model):
+        """Creates a function computing the Jacobian of the model by forward differences.
+
+        Without Dfun, LSODA approximates the Jacobian by perturbing every element of
+        the flat model state. Stored flux values are part of that state, but the derivatives
+        only depend on the state indices returned by model.rhs_state_indices(). The columns
+        of all other indices are zero, so only the model state it depends on is perturbed.
+        """
+        columns = model.rhs_state_indices()
+        size = model.state_size
+        jac = np.zeros((size, size))
+        step = np.sqrt(np.finfo(float).eps)
+
+        def jacobian(time, current_state):
+            f0 = model.model_function(time, current_state)
+            state = current_state.copy()
+            for i in columns:
+                h = step * max(abs(state[i]), 1.)
+                state[i] += h
+                jac[:, i] = (model.compute_derivatives(time, state) - f0) / h
+                state[i] = current_state[i]
+            return jac
+
+        return jacobian
+
+
 class StepwiseSolver(SolverABC):
     """Solver that can handle stepwise calculation built into xsimlab framework.
 
@@ -284,34 +335,44 @@ class StepwiseSolver(SolverABC):
 
         self.full_model_values = defaultdict()
 
+        # initial model state, extended with every registered variable and flux:
+        self._init_state = defaultdict()
+        # forcing values at time 0, evaluated once when each forcing is added:
+        self._init_forcings = defaultdict()
+
+        self._flat_state = None
+        self._flat_state_views = ()
+        self._var_state_len = 0
+        self._forcing_values = ()
+        self._forcing_now = {}
+
     @staticmethod
     def return_dims_and_array(value, model_time):
         """Helper function to create arrays of appropriate size,
         and assign initial value(s) to first index
         """
 
-        if np.size(value) == 1:
-            _dims = None
-            full_dims = (np.size(model_time),)
-            array_out = np.zeros(full_dims)
-            array_out[0] = value
-        elif len(np.shape(value)) == 1:
-            _dims = np.size(value)
-            full_dims = (_dims, np.size(model_time))
-            array_out = np.zeros(full_dims)
-            array_out[:, 0] = value
-        else:
-            _dims = np.shape(value)
-            full_dims = (*_dims, np.size(model_time))
-            array_out = np.zeros(full_dims)
-            array_out[..., 0] = value
-
+        _dims, full_dims = storage_dims(value, model_time)
+        # later time points are written by solve at each step:
+        array_out = np.empty(full_dims)
+        array_out[..., 0] = value
         return array_out, _dims
 
+    @staticmethod
+    def initial_state(array_out, dims):
+        """Helper function to return initial value(s) from first index of storage array."""
+        if dims is None:
+            return array_out[0]
+        elif isinstance(dims, int):
+            return array_out[:, 0]
+        else:
+            return array_out[..., 0]
+
     def add_variable(self, label, initial_value, model):
         """Method to reformat variable and return storage array."""
         array_out, _dims = self.return_dims_and_array(initial_value, model.time)
         model.var_dims[label] = _dims
+        self._init_state[label] = self.initial_state(array_out, _dims)
         return array_out
 
     def add_parameter(self, label, value):
@@ -321,41 +382,20 @@ class StepwiseSolver(SolverABC):
     def register_flux(self, label, flux, model, dims):
         """Method to reformat flux function with appropriate inputs and to proper size."""
 
-        var_in_dict = defaultdict()
-        for var_key, value in model.variables.items():
-            _dims = model.var_dims[var_key]
-            if _dims is None:
-                var_in_dict[var_key] = value[0]
-            elif isinstance(_dims, int):
-                var_in_dict[var_key] = value[:, 0]
-            else:
-                var_in_dict[var_key] = value[..., 0]
-
-        for flx_key, value in model.flux_values.items():
-            _dims = model.flux_dims[flx_key]
-            if _dims is None:
-                var_in_dict[flx_key] = value[0]
-            elif isinstance(_dims, int):
-                var_in_dict[flx_key] = value[:, 0]
-            else:
-                var_in_dict[flx_key] = value[..., 0]
-
-        forcing_now = defaultdict()
-        for key, func in model.forcing_func.items():
-            forcing_now[key] = func(0)
-
-        flux_init = to_ndarray(flux(state=var_in_dict,
+        flux_init = to_ndarray(flux(state=self._init_state,
                                     parameters=model.parameters,
-                                    forcings=forcing_now))
+                                    forcings=self._init_forcings))
 
         array_out, _dims = self.return_dims_and_array(flux_init, model.time)
 
         model.flux_dims[label] = _dims
+        self._init_state[label] = self.initial_state(array_out, _dims)
 
         return array_out
 
     def add_forcing(self, label, forcing_func, model):
         """Compute forcing over model time and provide as array."""
+        self._init_forcings[label] = forcing_func(0)
         return forcing_func(model.time)
 
     def assemble(self, model):
@@ -370,10 +410,27 @@ class StepwiseSolver(SolverABC):
             model.full_model_dims[flx_key] = _dims
             self.full_model_values[flx_key] = value
 
-        # TODO: diagnostic print here
-        # finally print model repr for diagnostic purposes:
-        # print("Model is assembled:")
-        # print(model)
+        # the current model state is kept in a single flat buffer, with views
+        # shaped like a single time step of each storage array:
+        sizes = [int(np.prod(value.shape[:-1])) for value in self.full_model_values.values()]
+        self._flat_state = np.empty(sum(sizes))
+        flat_state_views = []
+        index = 0
+        for value, size in zip(self.full_model_values.values(), sizes):
+            flat_state_views.append((self._flat_state[index:index + size].reshape(value.shape[:-1]), value))
+            index += size
+        self._flat_state_views = tuple(flat_state_views)
+        # variables come first in the flat state, followed by fluxes:
+        self._var_state_len = sum(sizes[:len(model.variables)])
+
+        # gather initial model state:
+        for flat_view, val in self._flat_state_views:
+            flat_view[...] = val[..., 0]
+
+        self._forcing_values = tuple(model.forcings.items())
+        self._forcing_now = {}
+
+        logger.debug("Model is assembled:\n%s", model)
 
     def solve(self, model, time_step):
         """Solve model in a stepwise fashion, calling this function at each time step."""
@@ -381,37 +438,26 @@ class StepwiseSolver(SolverABC):
         self.model_time += time_step
         self.time_index += 1
 
-        model_forcing = defaultdict()
-        for key, func in model.forcing_func.items():
+        model_forcing = self._forcing_now
+        for key, values in self._forcing_values:
             # retrieve pre-computed forcing:
-            model_forcing[key] = model.forcings[key][self.time_index]
-
-        model_state = []
-        for key, val in self.full_model_values.items():
-            if model.full_model_dims[key]:
-                model_state.append(val[..., self.time_index - 1])
-            else:
-                model_state.append(val[self.time_index - 1])
-
-        # flatten list for model function:
-        flat_model_state = np.concatenate(model_state, axis=None)
-
-        state_out = model.model_function(current_state=flat_model_state, forcing=model_forcing)
-
-        # unpack flat state:
-        state_dict = model.unpack_flat_state(state_out)
-
-        for key, val in model.variables.items():
-            if model.full_model_dims[key]:
-                val[..., self.time_index] = val[..., self.time_index - 1] + state_dict[key] * time_step
-            else:
-                val[self.time_index] = val[self.time_index - 1] + state_dict[key] * time_step
-
-        for key, val in model.flux_values.items():
-            if model.full_model_dims[key]:
-                val[..., self.time_index] = state_dict[key]
-            else:
-                val[self.time_index] = state_dict[key]
+            model_forcing[key] = values[self.time_index]
+
+        # flat model state holds the previous time step,
+        # the output is consumed below before the model is evaluated again, so it is not copied:
+        flat_state = self._flat_state
+        state_out = model.compute_derivatives(current_state=flat_state, forcing=model_forcing)
+
+        # advance flat model state in place, euler step for variables and current value for fluxes:
+        n_vars = self._var_state_len
+        flat_state[:n_vars] += state_out[:n_vars] * time_step
+        flat_state[n_vars:] = state_out[n_vars:]
+
+        # write model state to storage arrays, from the flat state views shaped
+        # like a single time step of each storage array:
+        time_index = self.time_index
+        for flat_view, val in self._flat_state_views:
+            val[..., time_index] = flat_view
 
     def cleanup(self):
         """Empty cleanup method, not necessary for this solver."""
@@ -1,11 +1,13 @@
 import xsimlab as xs
-from xsimlab.variable import VarIntent
-
-from collections import defaultdict
 
 from xso.backendcomps import Backend, RunSolver, Time, create_time_component
 
 
+def _is_stored_output(var):
+    """Returns True for xsimlab variables that store XSO model output."""
+    return (var.metadata.get('attrs') or {}).get('Phydra_store_out', False)
+
+
 def create(components, time_unit='d'):
     """Creates xsimlab Model instance, from dict of XSO components,
     automatically adding the necessary model backend, solver and time components.
@@ -29,8 +31,8 @@ def create(components, time_unit='d'):
         Xarray-simlab model object with the XSO core, Solver and Time components added.
     """
 
-    components.update({'Core': Backend, 'Solver': RunSolver, 'Time': create_time_component(time_unit)})
-    return xs.Model(components)
+    return xs.Model({**components,
+                     'Core': Backend, 'Solver': RunSolver, 'Time': create_time_component(time_unit)})
 
 
 def setup(solver, model, input_vars, output_vars=None, time=None):
@@ -87,20 +89,15 @@ def setup(solver, model, input_vars, output_vars=None, time=None):
     if time is None:
         raise Exception("Please supply (numpy) array of explicit timesteps to time keyword argument")
 
-    input_vars.update({'Core__solver_type': solver,
-                       'Time__time_input': time})
+    input_vars = {**input_vars,
+                  'Core__solver_type': solver,
+                  'Time__time_input': time}
 
     # convenient option "ALL" and providing set of values that automatically are returned with dim None:
     if output_vars == "ALL" or output_vars is None:
-        full_output_vars = defaultdict()
-        for var in model._var_cache.values():
-            try:
-                if var['metadata']['intent'] is VarIntent.OUT:
-                    if var['metadata']['attrs']['Phydra_store_out']:
-                        full_output_vars[var['name']] = None
-            except:
-                pass
-        output_vars = full_output_vars
+        output_vars = {p_name + '__' + var_name: None
+                       for p_name in model.all_vars_dict
+                       for var_name in xs.filter_variables(model[p_name], intent='out', func=_is_stored_output)}
     elif isinstance(output_vars, set):
         output_vars = {var: None for var in output_vars}
 
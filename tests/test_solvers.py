@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+
+import xso
+from xso.core import XSOCore
+from xso.solvers import ODEINTSolver
+
+
+@xso.component
+class StateVariable:
+    value = xso.variable(description='concentration of state variable')
+
+
+@xso.component
+class StateVariableArray:
+    values = xso.variable(dims='x', description='array of state variables')
+
+
+@xso.component
+class LinearInflow:
+    sink = xso.variable(foreign=True, flux='input', negative=False)
+    source = xso.forcing(foreign=True)
+    rate = xso.parameter(description='linear rate of inflow')
+
+    @xso.flux
+    def input(self, sink, source, rate):
+        return source * rate
+
+
+@xso.component
+class MonodGrowth:
+    resource = xso.variable(foreign=True, flux='uptake', negative=True)
+    consumer = xso.variable(foreign=True, flux='uptake', negative=False)
+    halfsat = xso.parameter(description='half-saturation constant')
+    mu_max = xso.parameter(description='maximum growth rate')
+
+    @xso.flux
+    def uptake(self, mu_max, resource, consumer, halfsat):
+        return mu_max * resource / (resource + halfsat) * consumer
+
+
+@xso.component
+class LinearOutflow_ListInput:
+    var_list = xso.variable(dims='flow_list', list_input=True,
+                            foreign=True, flux='decay', negative=True, description='variables flowing out')
+    rate = xso.parameter(description='linear rate of outflow')
+
+    @xso.flux(dims='flow_list')
+    def decay(self, var_list, rate):
+        return var_list * rate
+
+
+@xso.component
+class ArrayDecay:
+    arr = xso.variable(foreign=True, dims='x', flux='dec', negative=True)
+    rate = xso.parameter(dims='x')
+
+    @xso.flux(dims='x')
+    def dec(self, arr, rate):
+        return arr * rate
+
+
+@xso.component
+class ConstantExternalNutrient:
+    forcing = xso.forcing(setup_func='forcing_setup')
+    value = xso.parameter(description='constant value')
+
+    def forcing_setup(self, value):
+        @np.vectorize
+        def forcing(time):
+            return value
+        return forcing
+
+
+@pytest.fixture(scope='module')
+def model():
+    return xso.create({
+        'Nutrient': StateVariable,
+        'Phytoplankton': StateVariable,
+        'Arr': StateVariableArray,
+        'Inflow': LinearInflow,
+        'Outflow': LinearOutflow_ListInput,
+        'Growth': MonodGrowth,
+        'ADecay': ArrayDecay,
+        'N0': ConstantExternalNutrient,
+    })
+
+
+def run_model(model, solver, flux_workers=0):
+    input_vars = {
+        'Nutrient': {'value_label': 'N', 'value_init': 1.},
+        'Phytoplankton': {'value_label': 'P', 'value_init': 0.1},
+        'Arr': {'values_label': 'A', 'values_init': [1., 2., 3.]},
+        'Inflow': {'source': 'N0', 'rate': 0.1, 'sink': 'N'},
+        'Outflow': {'var_list': ['N', 'P'], 'rate': 0.1},
+        'Growth': {'resource': 'N', 'consumer': 'P', 'halfsat': 0.7, 'mu_max': 1.},
+        'ADecay': {'arr': 'A', 'rate': [0.1, 0.2, 0.3]},
+        'N0': {'forcing_label': 'N0', 'value': 1.},
+        'Core': {'flux_workers': flux_workers},
+    }
+    setup = xso.setup(solver=solver, model=model, time=np.arange(0, 20, 0.1), input_vars=input_vars)
+    with model:
+        return setup.xsimlab.run()
+
+
+def test_odeint_matches_solve_ivp(model):
+    out_odeint = run_model(model, 'odeint')
+    out_ivp = run_model(model, 'solve_ivp')
+
+    for var in ['Nutrient__value', 'Phytoplankton__value', 'Arr__values']:
+        np.testing.assert_allclose(out_odeint[var].values, out_ivp[var].values, rtol=1e-2, atol=1e-4)
+
+
+@pytest.mark.parametrize('solver', ['solve_ivp', 'odeint', 'stepwise'])
+def test_flux_workers_match_sequential(model, solver):
+    out_sequential = run_model(model, solver)
+    out_parallel = run_model(model, solver, flux_workers=4)
+
+    for var in out_sequential.data_vars:
+        if out_sequential[var].dtype.kind == 'f':
+            np.testing.assert_allclose(out_parallel[var].values, out_sequential[var].values,
+                                       rtol=1e-12, err_msg=var)
+
+
+def test_odeint_jacobian_matches_full_finite_differences():
+    core = XSOCore('odeint')
+    core.model.time = np.arange(0, 10, 0.1)
+
+    core.add_variable('N', 1.)
+    core.add_variable('P', 0.1)
+    core.add_variable('A', np.array([1., 2., 3.]))
+    core.add_parameter('mu', 1.)
+
+    # loss reads the value of uptake before it is computed in the same evaluation,
+    # uptake is not yet registered when loss is first called at registration
+    def loss(state, parameters, forcings):
+        return 0.1 * state.get('G_uptake', 0.) * state['P']
+    loss.state_labels = frozenset({'G_uptake', 'P'})
+
+    def uptake(state, parameters, forcings):
+        return parameters['mu'] * state['N'] / (state['N'] + 0.7) * state['P']
+    uptake.state_labels = frozenset({'N', 'P'})
+
+    def dec(state, parameters, forcings):
+        return state['A'] ** 2 * 0.1
+    dec.state_labels = frozenset({'A'})
+
+    core.register_flux('L_loss', loss)
+    core.register_flux('G_uptake', uptake)
+    core.register_flux('D_dec', dec, dims='x')
+    core.add_flux('L', 'P', 'loss', negative=True)
+    core.add_flux('G', 'N', 'uptake', negative=True)
+    core.add_flux('G', 'P', 'uptake')
+    core.add_flux('D', 'A', 'dec', negative=True)
+    core.assemble()
+
+    model = core.model
+    state = np.random.default_rng(0).uniform(0.5, 2., model.state_size)
+    jacobian = ODEINTSolver.jacobian_function(model)(0., state)
+
+    f0 = model.model_function(0., state)
+    full_jacobian = np.empty((model.state_size, model.state_size))
+    step = np.sqrt(np.finfo(float).eps)
+    for i in range(model.state_size):
+        perturbed = state.copy()
+        h = step * max(abs(state[i]), 1.)
+        perturbed[i] += h
+        full_jacobian[:, i] = (model.model_function(0., perturbed) - f0) / h
+
+    np.testing.assert_allclose(jacobian, full_jacobian, rtol=1e-6, atol=1e-6)
+    core.cleanup()